@@ -1,20 +1,31 @@
 import asyncio
+import functools
 import json
 import logging
+import math
 import os
-from datetime import datetime, time as dt_time, timedelta, timezone
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta, timezone
 from email.utils import parsedate_to_datetime
+from itertools import compress
+from typing import Iterator
+from zoneinfo import ZoneInfo
 
 import anthropic
-import pytz
+import cachetools
+import ijson
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from cogs_pipeline import run_daily_pipeline
 from competitor_monitor import run_price_monitor
 from google.oauth2 import service_account
 from googleapiclient.discovery import build as google_build
 from telegram import Update
-from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
+from telegram.ext import AIORateLimiter, ApplicationBuilder, ContextTypes, MessageHandler, filters
 
 load_dotenv()
 
@@ -27,18 +38,32 @@ RESTAURANT_SHEET_ID = "1BiiLjs30NF_O6xZz_O-G4bfgcbQnGP6GuRW12vgJJKo"
 SUPPLIER_SHEET_ID   = "1JMfhCB-af8DNnbYNe2Any2oakbNRJHOFvdFZXDMq1qg"
 
 _raw = os.getenv("ALLOWED_USER_IDS", "")
-ALLOWED_USER_IDS = [int(uid.strip()) for uid in _raw.split(",") if uid.strip()]
+ALLOWED_USER_IDS = frozenset(int(uid.strip()) for uid in _raw.split(",") if uid.strip())
 
 _raw_chat_id = os.getenv("DAILY_REPORT_CHAT_ID", "")
 DAILY_REPORT_CHAT_ID = int(_raw_chat_id.strip()) if _raw_chat_id.strip() else None
 
-logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s", level=logging.INFO)
+# Public HTTPS base URL; when set the bot receives updates by webhook instead of long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+# Seconds a still-open period (today, last 7 days) is served from cache before refetching
+SALES_CACHE_TTL = int(os.getenv("SALES_CACHE_TTL", "60"))
+
+_log_level = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+_valid_log_level = isinstance(logging.getLevelName(_log_level), int)
+logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s",
+                    level=_log_level if _valid_log_level else logging.INFO)
+# httpx logs every getUpdates/sendMessage call at INFO — keep only its warnings
+logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
+if not _valid_log_level:
+    logger.warning("Unknown LOG_LEVEL %r — using INFO", _log_level)
 
 claude = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
 # Flour Cloud POS system uses Berlin local dates
-BERLIN_TZ = pytz.timezone("Europe/Berlin")
+BERLIN_TZ = ZoneInfo("Europe/Berlin")
 
 # Gmail inboxes to search
 GMAIL_INBOXES = [
@@ -51,13 +76,169 @@ GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 _SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service_account.json")
 
 
+# ---------------------------------------------------------------------------
+# HTTP sessions
+# ---------------------------------------------------------------------------
+
+def _make_session(headers: dict) -> requests.Session:
+    """Keep-alive session with connection pooling and retry/backoff on 429/5xx.
+
+    urllib3 sleeps for the server's Retry-After on 429/503, otherwise backs off
+    exponentially (0.5s, 1s, 2s).
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+    session.headers.update(headers)
+    return session
+
+
+# One session per host so each token is only ever sent to its own API
+_SHOPIFY_HTTP = _make_session({"X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN or ""})
+_FLOUR_HTTP   = _make_session({"Authorization": f"Bearer {FLOUR_CLOUD_TOKEN}"})
+
+
+def _prewarm_sessions() -> None:
+    """Open the pooled TLS connections up front so the first user query skips the handshake."""
+    targets = (
+        (_SHOPIFY_HTTP, f"https://{SHOPIFY_STORE}/admin/api/2024-10/shop.json"),
+        (_FLOUR_HTTP, "https://flour.host/v3/documents"),
+    )
+    for session, url in targets:
+        try:
+            session.head(url, timeout=5)
+        except requests.RequestException as e:
+            logger.warning("Connection prewarm failed for %s: %s", url, e)
+
+
+def _iter_json_items(response: requests.Response, prefixes: tuple) -> Iterator[dict]:
+    """Stream-parse a JSON body, yielding each object element of the array under `prefixes`.
+
+    Only one element is materialised at a time, so large pages never have to be
+    held in memory as a full dict tree. When several prefixes are given, the first
+    one that has an element wins and the others are ignored; non-object elements
+    are skipped.
+    """
+    response.raw.decode_content = True  # let urllib3 handle gzip
+    if len(prefixes) == 1:
+        # Known shape: let the C backend build each element instead of the event loop below
+        for item in ijson.items(response.raw, prefixes[0], use_float=True):
+            if isinstance(item, dict):
+                yield item
+        return
+    active, builder, depth = None, None, 0
+    for prefix, event, value in ijson.parse(response.raw, use_float=True):
+        if builder is None:
+            if prefix not in prefixes or event in ("end_map", "end_array", "map_key"):
+                continue
+            if active is None:
+                active = prefix
+            elif prefix != active:
+                continue
+            if event != "start_map":
+                continue  # scalar or nested-array element (nested events use a deeper prefix)
+            builder, depth = ijson.ObjectBuilder(), 0
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                yield builder.value
+                builder = None
+
+
+# ---------------------------------------------------------------------------
+# Sales data caching
+# ---------------------------------------------------------------------------
+
+def _ttl_for(period: str) -> int:
+    """Cache lifetime in seconds: closed periods can't change, live ones are kept briefly."""
+    if period in ("yesterday", "last_week", "last_month"):
+        return 86400
+    if period in ("this_week", "this_month"):
+        return 600
+    return SALES_CACHE_TTL  # today, last_7_days
+
+
+def _ttl_for_range(start_iso: str, end_iso: str) -> int:
+    """_ttl_for's policy for an explicit Berlin date range: closed ranges 24h,
+    this_week/this_month 10 min, anything else still open (today, last 7 days) SALES_CACHE_TTL.
+
+    The cache is keyed by range, so when two open periods share one (on the 8th,
+    last_7_days == this_month; on a Monday/the 1st, this_week/this_month == today)
+    the shorter TTL wins.
+    """
+    today = datetime.now(BERLIN_TZ).date()
+    today_iso = today.isoformat()
+    if end_iso < today_iso:
+        return 86400
+    if start_iso in (today_iso, (today - timedelta(days=7)).isoformat()):
+        return SALES_CACHE_TTL  # today / last_7_days
+    week_start = (today - timedelta(days=today.weekday())).isoformat()
+    month_start = today.replace(day=1).isoformat()
+    if start_iso in (week_start, month_start):
+        return 600
+    return SALES_CACHE_TTL
+
+
+def _ttl_cached(ttl_of, maxsize: int = 32):
+    """Thread-safe memoiser where ttl_of(*args) sets each entry's lifetime.
+
+    Concurrent misses on the same key wait for the first caller's result
+    instead of each repeating the fetch.
+    """
+    cache = cachetools.TLRUCache(maxsize=maxsize, ttu=lambda key, value, now: now + ttl_of(*key))
+    lock = threading.Lock()
+    in_flight = {}  # args -> Event set once the owning call finishes
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            while True:
+                with lock:
+                    if args in cache:
+                        return cache[args]
+                    done = in_flight.get(args)
+                    owner = done is None
+                    if owner:
+                        done = in_flight[args] = threading.Event()
+                if owner:
+                    break
+                done.wait()  # then re-check; if the owner failed, one waiter takes over
+            try:
+                value = fn(*args)
+                with lock:
+                    cache[args] = value
+                return value
+            finally:
+                with lock:
+                    del in_flight[args]
+                done.set()
+        return wrapper
+    return decorator
+
+
 # ---------------------------------------------------------------------------
 # Date ranges
 # ---------------------------------------------------------------------------
 
-def get_date_range(period: str):
-    now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+@functools.lru_cache(maxsize=8)
+def _utc_day_start(day: date) -> datetime:
+    """Midnight UTC at the start of `day`, built once per day."""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def get_date_range(period: str, now: datetime = None):
+    """Return (start, end) UTC datetimes. Pass `now` to share one clock reading across calls."""
+    now = now or datetime.now(timezone.utc)
+    today_start = _utc_day_start(now.astimezone(timezone.utc).date())
 
     if period == "today":
         return today_start, now
@@ -76,7 +257,7 @@ def get_date_range(period: str):
     if period == "last_month":
         first_of_this_month = today_start.replace(day=1)
         last_month_end = first_of_this_month - timedelta(seconds=1)
-        return last_month_end.replace(day=1), last_month_end
+        return _utc_day_start(last_month_end.date().replace(day=1)), last_month_end
     return today_start, now  # fallback
 
 
@@ -91,6 +272,10 @@ PERIOD_LABELS = {
 }
 
 
+def _period_label(period: str) -> str:
+    return PERIOD_LABELS.get(period, period)
+
+
 # ---------------------------------------------------------------------------
 # Shopify
 # ---------------------------------------------------------------------------
@@ -102,63 +287,131 @@ def _parse_next_link(link_header: str):
     return None
 
 
-def fetch_shopify_orders(start: datetime, end: datetime) -> list:
-    url = f"https://{SHOPIFY_STORE}/admin/api/2024-10/orders.json"
-    headers = {"X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN}
-    params = {
-        "status": "any",
-        "created_at_min": start.isoformat(),
-        "created_at_max": end.isoformat(),
-        "limit": 250,
+# Every financial status except refunded/voided
+SHOPIFY_COUNTED_FINANCIAL_STATUSES = "paid,partially_paid,pending,authorized,partially_refunded"
+
+_SHOPIFY_ORDERS_URL = f"https://{SHOPIFY_STORE}/admin/api/2024-10/orders.json"
+
+# Static part of the first-page query; only the created_at bounds vary per call
+_SHOPIFY_ORDER_PARAMS = {
+    "status": "any",
+    # Refunded/voided orders are excluded by Shopify rather than downloaded and dropped
+    "financial_status": SHOPIFY_COUNTED_FINANCIAL_STATUSES,
+    # Only what _shopify_columns reads — every extra field is decoded once per order
+    "fields": "total_price,financial_status,line_items",
+    "limit": 250,
+}
+
+
+def fetch_shopify_orders(start: datetime, end: datetime) -> Iterator[dict]:
+    """Yield non-refunded/voided orders one at a time, streaming each page."""
+    params = {**_SHOPIFY_ORDER_PARAMS, "created_at_min": start.isoformat(), "created_at_max": end.isoformat()}
+    # The next page's URL is in the Link header, which arrives before the body —
+    # so page N+1 is requested in the background while page N is still streaming.
+    # This caps one pagination at two requests in flight; it does not limit the
+    # request rate — Shopify 429s are absorbed by the session's urllib3 Retry.
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        pending = prefetch.submit(_SHOPIFY_HTTP.get, _SHOPIFY_ORDERS_URL, params=params, timeout=30, stream=True)
+        try:
+            while pending is not None:
+                with pending.result() as response:
+                    response.raise_for_status()
+                    next_url = _parse_next_link(response.headers.get("Link", ""))
+                    pending = (
+                        prefetch.submit(_SHOPIFY_HTTP.get, next_url, timeout=30, stream=True)
+                        if next_url else None
+                    )
+                    yield from _iter_json_items(response, ("orders.item",))
+        finally:
+            # Consumer stopped or failed mid-page: release the prefetched page's connection now
+            if pending is not None:
+                try:
+                    pending.result().close()
+                except Exception:
+                    pass
+
+
+def _shopify_columns(start: datetime, end: datetime) -> dict:
+    """
+    Single pass over the orders in start..end, projected into columns:
+      order_count / revenue                       — order-level totals
+      titles (pre-casefolded) / quantities / line_revenue (price × qty) — one entry per line item
+    """
+    order_totals = []
+    titles, quantities, line_revenue = [], [], []
+    for order in fetch_shopify_orders(start, end):
+        # Safety net in case Shopify ever ignores the financial_status filter
+        if order.get("financial_status") in ("refunded", "voided"):
+            continue
+        order_totals.append(order["total_price"])
+        for item in order.get("line_items", ()):
+            qty = item["quantity"]
+            titles.append(item["title"].casefold())
+            quantities.append(qty)
+            line_revenue.append(float(item["price"]) * qty)
+    return {
+        "order_count":  len(order_totals),
+        # fsum is exactly rounded, so long ranges don't drift by cents
+        "revenue":      math.fsum(map(float, order_totals)),
+        "titles":       tuple(titles),
+        "quantities":   tuple(quantities),
+        "line_revenue": tuple(line_revenue),
     }
-    all_orders = []
-    while True:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-        response.raise_for_status()
-        page = response.json().get("orders", [])
-        all_orders.extend(page)
-        if len(page) < 250:
-            break
-        next_url = _parse_next_link(response.headers.get("Link", ""))
-        if not next_url:
-            break
-        url = next_url
-        params = {}
-    return [o for o in all_orders if o.get("financial_status") not in ("refunded", "voided")]
 
 
-def shopify_sales(period: str) -> dict:
-    start, end = get_date_range(period)
-    orders = fetch_shopify_orders(start, end)
-    revenue = sum(float(o["total_price"]) for o in orders)
-    return {"revenue": revenue, "order_count": len(orders), "period": period}
+@_ttl_cached(lambda period, utc_day: _ttl_for(period), maxsize=16)
+def _shopify_period_columns(period: str, utc_day: date) -> dict:
+    """_shopify_columns for a named period, cached per (period, UTC day) with a period-based TTL."""
+    return _shopify_columns(*get_date_range(period))
+
+
+def _shopify_columns_for(period: str, now: datetime = None) -> dict:
+    # An explicit clock means the caller wants a fresh, consistent read — bypass the cache
+    if now is not None:
+        return _shopify_columns(*get_date_range(period, now))
+    return _shopify_period_columns(period, datetime.now(timezone.utc).date())
+
+
+def shopify_sales(period: str, now: datetime = None) -> dict:
+    cols = _shopify_columns_for(period, now)
+    return {"revenue": cols["revenue"], "order_count": cols["order_count"], "period": period}
+
+
+def _product_matcher(product: str, synonyms=()):
+    """
+    Compile the product name plus any synonyms into one alternation regex,
+    so each (pre-casefolded) title is scanned once in C for all needles.
+    Casefolding both sides also matches German spellings like "weiß" / "weiss".
+    """
+    needles = {n.casefold().strip() for n in (product, *synonyms) if n and n.strip()}
+    if not needles:
+        return lambda title: None  # an empty pattern would match every title
+    pattern = "|".join(re.escape(n) for n in sorted(needles, key=len, reverse=True))
+    return re.compile(pattern).search
 
 
-def shopify_product_sales(period: str, product: str) -> dict:
-    start, end = get_date_range(period)
-    orders = fetch_shopify_orders(start, end)
-    needle = product.lower()
-    total_qty, total_rev = 0, 0.0
-    for order in orders:
-        for item in order.get("line_items", []):
-            if needle in item["title"].lower():
-                total_qty += item["quantity"]
-                total_rev += float(item["price"]) * item["quantity"]
-    return {"product": product, "quantity": total_qty, "revenue": total_rev, "period": period}
+def shopify_product_sales(period: str, product: str, synonyms=()) -> dict:
+    matches = _product_matcher(product, synonyms)
+    cols = _shopify_columns_for(period)
+    mask = list(map(matches, cols["titles"]))  # match objects are truthy, None is not
+    total_qty = sum(compress(cols["quantities"], mask))
+    total_rev = math.fsum(compress(cols["line_revenue"], mask))
+    matched = sorted({m.group() for m in mask if m})
+    return {"product": product, "quantity": total_qty, "revenue": total_rev, "period": period,
+            "matched_terms": matched}
 
 
 # ---------------------------------------------------------------------------
 # Flour Cloud (retail POS)
 # ---------------------------------------------------------------------------
 
-def _berlin_date_range(period: str):
+def _berlin_date_range(period: str, today=None):
     """Return (start_date, end_date) as date objects in Europe/Berlin local time.
 
     Flour Cloud document dates are Berlin-local calendar dates, so we compute
     the range directly in that timezone rather than converting UTC boundaries.
     """
-    from datetime import date as _date
-    today = datetime.now(BERLIN_TZ).date()
+    today = today or datetime.now(BERLIN_TZ).date()
 
     if period == "today":
         return today, today
@@ -184,106 +437,190 @@ def _berlin_date_range(period: str):
     return today, today  # fallback
 
 
-def fetch_flour_cloud_docs(start_date, end_date) -> list:
-    headers = {"Authorization": f"Bearer {FLOUR_CLOUD_TOKEN}"}
-    all_docs = []
-    skip = 0
-    PAGE = 1000
+def _stream_flour_cloud_docs(start_date, end_date) -> Iterator[dict]:
+    """Yield receipts dated start_date..end_date (Berlin), streaming each page.
+
+    Docs arrive newest-first, so the first doc older than start_date ends the
+    whole fetch — the rest of that page is never read.
 
-    while True:
-        params = {"limit": PAGE, "type": "R", "sort": "-date", "skip": skip}
-        response = requests.get(
+    The documents endpoint has no date filter, so the page size starts small
+    (recent ranges like "today" are usually covered by the first page) and
+    doubles up to MAX_PAGE for longer ranges.
+    """
+    skip = 0
+    page_limit = 200
+    MAX_PAGE = 1000
+    raw_count = 0
+    done = False
+    # ISO-8601 dates sort correctly as strings — compare without parsing each doc's date
+    start_s, end_s = start_date.isoformat(), end_date.isoformat()
+
+    while not done:
+        params = {"limit": page_limit, "type": "R", "sort": "-date", "skip": skip}
+        with _FLOUR_HTTP.get(
             "https://flour.host/v3/documents",
-            headers=headers,
             params=params,
             timeout=30,
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        page = data if isinstance(data, list) else (data.get("docs") or data.get("documents") or data.get("data") or [])
-
-        if not page:
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+
+            page_size = 0
+            for doc in _iter_json_items(response, ("item", "docs.item", "documents.item", "data.item")):
+                page_size += 1
+                doc_date = str(doc.get("date", ""))[:10]
+                if len(doc_date) != 10 or doc_date[4] != "-":
+                    continue  # missing/malformed date
+                if doc_date > end_s:
+                    continue
+                if doc_date < start_s:
+                    done = True
+                    break
+                yield doc
+            if done:
+                # Read off the rest of the page so the keep-alive connection returns to the pool
+                response.raw.drain_conn()
+
+        raw_count += page_size
+        if page_size < page_limit:
             break
+        skip += page_limit
+        page_limit = min(page_limit * 2, MAX_PAGE)
 
-        all_docs.extend(page)
-
-        # Stop early if the oldest doc on this page is before our start date
-        oldest_date_str = str(page[-1].get("date", ""))[:10]
-        try:
-            if datetime.fromisoformat(oldest_date_str).date() < start_date:
-                break
-        except ValueError:
-            pass
+    logger.info("Flour Cloud: streamed %d raw docs (paginated), filtered %s → %s (Berlin)", raw_count, start_date, end_date)
 
-        if len(page) < PAGE:
-            break
 
-        skip += PAGE
+@_ttl_cached(_ttl_for_range)
+def _flour_cloud_columns(start_iso: str, end_iso: str) -> dict:
+    """
+    Columnar projection of the receipts, streamed straight from Flour Cloud and
+    cached per date range — raw receipt dicts are never held beyond one page item:
+      doc_dates (ISO strings) / doc_revenue      — one entry per receipt
+      item_titles / item_amounts / item_totals — one entry per non-cancelled item,
+                                                 titles pre-casefolded
+    """
+    doc_dates, doc_revenue = [], []
+    item_titles, item_amounts, item_totals = [], [], []
+    for doc in _stream_flour_cloud_docs(date.fromisoformat(start_iso), date.fromisoformat(end_iso)):
+        doc_rev = 0.0
+        for item in doc.get("items", ()):
+            if item.get("cancelled"):
+                continue
+            total = float(item.get("totalIncVat", 0))
+            doc_rev += total
+            item_titles.append(str(item.get("title", "")).casefold())
+            item_amounts.append(int(item.get("amount", 0)))
+            item_totals.append(total)
+        doc_dates.append(str(doc.get("date", ""))[:10])
+        doc_revenue.append(doc_rev)
+    return {
+        "doc_dates":    tuple(doc_dates),
+        "doc_revenue":  tuple(doc_revenue),
+        "item_titles":  tuple(item_titles),
+        "item_amounts": tuple(item_amounts),
+        "item_totals":  tuple(item_totals),
+    }
 
-    logger.info("Flour Cloud: fetched %d raw docs (paginated), filtering %s → %s (Berlin)", len(all_docs), start_date, end_date)
 
-    filtered = []
-    for doc in all_docs:
-        raw_date = str(doc.get("date", ""))[:10]
-        try:
-            if start_date <= datetime.fromisoformat(raw_date).date() <= end_date:
-                filtered.append(doc)
-        except ValueError:
-            continue
-    return filtered
+def flour_cloud_sales_multi(periods, today=None) -> dict:
+    """Return {period: sales dict} for several periods from one fetch spanning all of them."""
+    ranges = {p: _berlin_date_range(p, today) for p in periods}
+    results = {p: {"revenue": 0.0, "transaction_count": 0, "period": p} for p in periods}
+    span_start = min(r[0] for r in ranges.values())
+    span_end   = max(r[1] for r in ranges.values())
+    cols = _flour_cloud_columns(span_start.isoformat(), span_end.isoformat())
+    for p, (start_date, end_date) in ranges.items():
+        start_s, end_s = start_date.isoformat(), end_date.isoformat()
+        mask = [start_s <= d <= end_s for d in cols["doc_dates"]]
+        results[p]["revenue"] = math.fsum(compress(cols["doc_revenue"], mask))
+        results[p]["transaction_count"] = sum(mask)
+    return results
 
 
-def flour_cloud_sales(period: str) -> dict:
-    start_date, end_date = _berlin_date_range(period)
-    docs = fetch_flour_cloud_docs(start_date, end_date)
-    total_rev = 0.0
-    for doc in docs:
-        for item in doc.get("items", []):
-            if item.get("cancelled"):
-                continue
-            total_rev += float(item.get("totalIncVat", 0))
-    return {"revenue": total_rev, "transaction_count": len(docs), "period": period}
+def flour_cloud_sales(period: str, today=None) -> dict:
+    return flour_cloud_sales_multi((period,), today)[period]
 
 
-def flour_cloud_product_sales(period: str, product: str) -> dict:
-    start_date, end_date = _berlin_date_range(period)
-    docs = fetch_flour_cloud_docs(start_date, end_date)
-    needle = product.lower()
-    total_qty, total_rev = 0, 0.0
-    for doc in docs:
-        for item in doc.get("items", []):
-            if item.get("cancelled"):
-                continue
-            if needle in str(item.get("title", "")).lower():
-                total_qty += int(item.get("amount", 0))
-                total_rev += float(item.get("totalIncVat", 0))
-    return {"product": product, "quantity": total_qty, "revenue": total_rev, "period": period}
+def flour_cloud_product_sales(period: str, product: str, synonyms=(), today=None) -> dict:
+    start_date, end_date = _berlin_date_range(period, today)
+    matches = _product_matcher(product, synonyms)
+    cols = _flour_cloud_columns(start_date.isoformat(), end_date.isoformat())
+    mask = list(map(matches, cols["item_titles"]))  # match objects are truthy, None is not
+    total_qty = sum(compress(cols["item_amounts"], mask))
+    total_rev = math.fsum(compress(cols["item_totals"], mask))
+    matched = sorted({m.group() for m in mask if m})
+    return {"product": product, "quantity": total_qty, "revenue": total_rev, "period": period,
+            "matched_terms": matched}
 
 
 # ---------------------------------------------------------------------------
 # Restaurant sales (Google Sheets)
 # ---------------------------------------------------------------------------
 
-def _fetch_restaurant_tab(tab_name: str, find_date_str: str = None) -> dict:
+def _thread_cached(fn):
+    """Memoise per worker thread — googleapiclient (httplib2) clients are not thread-safe."""
+    local = threading.local()
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        cache = local.__dict__.setdefault("cache", {})
+        if args not in cache:
+            cache[args] = fn(*args)
+        return cache[args]
+    return wrapper
+
+
+@_thread_cached
+def _sheets_service():
+    """Read-only Sheets client, built once per thread and shared by restaurant + supplier lookups."""
+    creds = service_account.Credentials.from_service_account_info(
+        _load_service_account_info(), scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
+    )
+    return google_build("sheets", "v4", credentials=creds, cache_discovery=False, static_discovery=True)
+
+
+_EUR_TBL = str.maketrans("", "", "€, \t\n")
+
+
+def _parse_eur(val, default=0.0):
+    """Parse a sheet cell like "€1,234.50" (or a raw number) to float; `default` if unparseable."""
+    if isinstance(val, (int, float)):
+        return float(val)
+    try:
+        return float(str(val).translate(_EUR_TBL))
+    except ValueError:
+        return default
+
+
+def _batch_get_restaurant_tabs(tab_names: list) -> list:
+    """
+    Fetch row 3 (date headers) and the data area for each tab in one batchGet.
+    Returns [(row3, rows), ...] in the same order as tab_names.
+    """
+    ranges = []
+    for tab in tab_names:
+        ranges += [f"'{tab}'!A3:AZ3", f"'{tab}'!A200:AZ350"]
+    value_ranges = _sheets_service().spreadsheets().values().batchGet(
+        spreadsheetId=RESTAURANT_SHEET_ID,
+        ranges=ranges,
+    ).execute().get("valueRanges", [])
+    values = [vr.get("values", []) for vr in value_ranges]
+    values += [[]] * (len(ranges) - len(values))
+    return [
+        ((values[i] or [[]])[0], values[i + 1])
+        for i in range(0, len(ranges), 2)
+    ]
+
+
+def _parse_restaurant_tab(tab_name: str, row3: list, rows: list, find_date_str: str = None) -> dict:
     """
-    Fetch restaurant sales from one monthly tab.
+    Extract restaurant sales from one monthly tab's fetched values.
     Returns {"mtd": float, "daily": float|None}
     find_date_str: date in DD/MM/YYYY format to look up the daily column.
     """
-    info = _load_service_account_info()
-    creds = service_account.Credentials.from_service_account_info(
-        info, scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
-    )
-    svc = google_build("sheets", "v4", credentials=creds, cache_discovery=False)
-
     # Locate the column for the requested date
     date_col = None
     if find_date_str:
-        row3 = svc.spreadsheets().values().get(
-            spreadsheetId=RESTAURANT_SHEET_ID,
-            range=f"'{tab_name}'!A3:AZ3",
-        ).execute().get("values", [[]])[0]
         for i, val in enumerate(row3):
             if val == find_date_str:
                 date_col = i
@@ -291,30 +628,27 @@ def _fetch_restaurant_tab(tab_name: str, find_date_str: str = None) -> dict:
         if date_col is None:
             logger.warning("Restaurant sheet: date %s not found in row 3 of %s", find_date_str, tab_name)
 
-    # Fetch all rows in the data area (wide enough to cover daily columns)
-    rows = svc.spreadsheets().values().get(
-        spreadsheetId=RESTAURANT_SHEET_ID,
-        range=f"'{tab_name}'!A200:AZ350",
-    ).execute().get("values", [])
-
-    def _parse(val):
-        try:
-            return float(str(val).replace("€", "").replace(",", "").strip())
-        except ValueError:
-            return None
-
     for row in rows:
         if len(row) > 3 and "restaurant sales" in str(row[3]).lower():
-            mtd   = _parse(row[4]) if len(row) > 4 else None
-            daily = _parse(row[date_col]) if (date_col is not None and date_col < len(row)) else None
+            mtd   = _parse_eur(row[4], None) if len(row) > 4 else None
+            daily = _parse_eur(row[date_col], None) if (date_col is not None and date_col < len(row)) else None
             return {"mtd": mtd or 0.0, "daily": daily}
 
     return {"mtd": 0.0, "daily": None}
 
 
-def restaurant_sales_all() -> dict:
+def _fetch_restaurant_tab(tab_name: str, find_date_str: str = None) -> dict:
+    """
+    Fetch restaurant sales from one monthly tab (single Sheets round-trip).
+    Returns {"mtd": float, "daily": float|None}
+    """
+    (row3, rows), = _batch_get_restaurant_tabs([tab_name])
+    return _parse_restaurant_tab(tab_name, row3, rows, find_date_str)
+
+
+def restaurant_sales_all(now_berlin: datetime = None) -> dict:
     """Return {"yesterday": float, "mtd": float} fetching from the sheet."""
-    now_berlin = datetime.now(BERLIN_TZ)
+    now_berlin = now_berlin or datetime.now(BERLIN_TZ)
     yesterday  = now_berlin - timedelta(days=1)
     yday_tab   = yesterday.strftime("%B %Y")
     mtd_tab    = now_berlin.strftime("%B %Y")
@@ -325,9 +659,10 @@ def restaurant_sales_all() -> dict:
         logger.info("Restaurant sales — yesterday: €%.2f  MTD: €%.2f", result["daily"] or 0, result["mtd"])
         return {"yesterday": result["daily"] or 0.0, "mtd": result["mtd"]}
     else:
-        # Month boundary: yesterday was in a different month
-        yday_result = _fetch_restaurant_tab(yday_tab, yday_str)
-        mtd_result  = _fetch_restaurant_tab(mtd_tab)
+        # Month boundary: yesterday was in a different month — both tabs in one batchGet
+        (yday_row3, yday_rows), (mtd_row3, mtd_rows) = _batch_get_restaurant_tabs([yday_tab, mtd_tab])
+        yday_result = _parse_restaurant_tab(yday_tab, yday_row3, yday_rows, yday_str)
+        mtd_result  = _parse_restaurant_tab(mtd_tab, mtd_row3, mtd_rows)
         logger.info("Restaurant sales (cross-month) — yesterday: €%.2f  MTD: €%.2f",
                     yday_result["daily"] or 0, mtd_result["mtd"])
         return {"yesterday": yday_result["daily"] or 0.0, "mtd": mtd_result["mtd"]}
@@ -337,57 +672,64 @@ def restaurant_sales_all() -> dict:
 # Supplier outstanding (Google Sheets)
 # ---------------------------------------------------------------------------
 
-def _supplier_sheets_svc():
-    info = _load_service_account_info()
-    creds = service_account.Credentials.from_service_account_info(
-        info, scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
-    )
-    return google_build("sheets", "v4", credentials=creds, cache_discovery=False)
+@functools.lru_cache(maxsize=1)
+def _supplier_tab_index() -> tuple:
+    """
+    Lowercased index of the supplier ledger's tab titles: ({lower: title}, ((lower, title), ...)).
+    Cleared by fetch_supplier_outstanding on a miss.
+    """
+    meta = _sheets_service().spreadsheets().get(
+        spreadsheetId=SUPPLIER_SHEET_ID,
+        fields="sheets/properties/title",
+    ).execute()
+    pairs = tuple((s["properties"]["title"].lower(), s["properties"]["title"]) for s in meta["sheets"])
+    return {lc: tab for lc, tab in reversed(pairs)}, pairs
 
 
-def _find_supplier_tab(svc, query: str):
+def _find_supplier_tab(query: str):
     """Fuzzy-match a supplier name to the closest tab name."""
-    meta = svc.spreadsheets().get(spreadsheetId=SUPPLIER_SHEET_ID).execute()
-    tab_names = [s["properties"]["title"] for s in meta["sheets"]]
+    exact, pairs = _supplier_tab_index()
     q = query.lower().strip()
     # Exact match first, then prefix, then substring
-    for tab in tab_names:
-        if tab.lower() == q:
-            return tab
-    for tab in tab_names:
-        if tab.lower().startswith(q) or q.startswith(tab.lower()):
+    if q in exact:
+        return exact[q]
+    substring_match = None
+    for lc, tab in pairs:
+        if lc.startswith(q) or q.startswith(lc):
             return tab
-    for tab in tab_names:
-        if q in tab.lower() or tab.lower() in q:
-            return tab
-    return None
-
-
-def _parse_eur(val: str) -> float:
-    try:
-        return float(str(val).replace("€", "").replace(",", "").replace(" ", "").strip())
-    except ValueError:
-        return 0.0
+        if substring_match is None and (q in lc or lc in q):
+            substring_match = tab
+    return substring_match
 
 
 def fetch_supplier_outstanding(supplier_name: str) -> dict:
-    svc = _supplier_sheets_svc()
-    tab = _find_supplier_tab(svc, supplier_name)
+    svc = _sheets_service()
+    tab = _find_supplier_tab(supplier_name)
+    if not tab:
+        # Tab list may be stale (new supplier added) — refresh once
+        _supplier_tab_index.cache_clear()
+        tab = _find_supplier_tab(supplier_name)
     if not tab:
         return {"error": f"No supplier tab found matching '{supplier_name}'"}
 
-    rows = svc.spreadsheets().values().get(
+    # Only the summary cells (G2:J2) and the invoice table (row 8 onwards).
+    # Amounts come back as raw numbers; dates keep their sheet formatting.
+    value_ranges = svc.spreadsheets().values().batchGet(
         spreadsheetId=SUPPLIER_SHEET_ID,
-        range=f"'{tab}'!A1:O60",
-    ).execute().get("values", [])
+        ranges=[f"'{tab}'!G2:J2", f"'{tab}'!A8:O60"],
+        valueRenderOption="UNFORMATTED_VALUE",
+        dateTimeRenderOption="FORMATTED_STRING",
+    ).execute().get("valueRanges", [])
+    summary_rows = value_ranges[0].get("values", []) if len(value_ranges) > 0 else []
+    rows         = value_ranges[1].get("values", []) if len(value_ranges) > 1 else []
 
-    # Row 2 (idx 1): summary totals at col G (idx 6) and col J (idx 9)
-    summary_row = rows[1] if len(rows) > 1 else []
-    total_due     = _parse_eur(summary_row[6])  if len(summary_row) > 6  else 0.0
-    total_balance = _parse_eur(summary_row[9])  if len(summary_row) > 9  else 0.0
+    # Row 2: TOTAL PAYMENT DUE at col G (idx 0 here) and TOTAL PAYMENT BALANCE at col J (idx 3)
+    summary_row = summary_rows[0] if summary_rows else []
+    total_due     = _parse_eur(summary_row[0])  if len(summary_row) > 0  else 0.0
+    total_balance = _parse_eur(summary_row[3])  if len(summary_row) > 3  else 0.0
 
-    # Find header row (contains "Invoice Date") then parse data rows below it
-    header_idx = next((i for i, r in enumerate(rows) if any("Invoice Date" in str(c) for c in r)), 7)
+    # Find header row (contains "Invoice Date", normally row 8) then parse data rows below it
+    header_idx = next((i for i, r in enumerate(rows) if any("Invoice Date" in str(c) for c in r)), 0)
 
     invoices = []
     for row in rows[header_idx + 1:]:
@@ -451,6 +793,7 @@ def fmt_supplier_outstanding(data: dict) -> str:
 # Gmail
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=1)
 def _load_service_account_info() -> dict:
     """Load service account creds from file (local) or env var (Railway)."""
     if os.path.exists(_SERVICE_ACCOUNT_FILE):
@@ -462,12 +805,19 @@ def _load_service_account_info() -> dict:
     raise RuntimeError("No service account credentials found — set GOOGLE_SERVICE_ACCOUNT_JSON env var on Railway")
 
 
-def _gmail_service(email: str):
-    info = _load_service_account_info()
-    creds = service_account.Credentials.from_service_account_info(
-        info, scopes=GMAIL_SCOPES
+@functools.lru_cache(maxsize=None)
+def _gmail_credentials(email: str):
+    """Delegated credentials for `email`, shared process-wide so the OAuth token is reused until expiry."""
+    return service_account.Credentials.from_service_account_info(
+        _load_service_account_info(), scopes=GMAIL_SCOPES
     ).with_subject(email)
-    return google_build("gmail", "v1", credentials=creds, cache_discovery=False)
+
+
+@_thread_cached
+def _gmail_service(email: str):
+    """Gmail client delegated to `email`, cached per inbox and thread (httplib2 is not thread-safe)."""
+    return google_build("gmail", "v1", credentials=_gmail_credentials(email),
+                        cache_discovery=False, static_discovery=True)
 
 
 def _fmt_email_date(raw: str) -> str:
@@ -479,16 +829,41 @@ def _fmt_email_date(raw: str) -> str:
 
 def search_inbox(email: str, query: str, max_results: int = 3) -> list:
     svc = _gmail_service(email)
-    res = svc.users().messages().list(userId="me", q=query, maxResults=max_results).execute()
+    res = svc.users().messages().list(
+        userId="me", q=query, maxResults=max_results, fields="messages/id",
+    ).execute()
     messages = res.get("messages", [])
+    if not messages:
+        return []
+
+    # Fetch all message headers in one batched HTTP round-trip
+    details, errors = {}, []
+
+    def _on_detail(request_id, response, exception):
+        if exception is not None:
+            errors.append(exception)
+        else:
+            details[request_id] = response
+
+    batch = svc.new_batch_http_request(callback=_on_detail)
+    for msg in messages:
+        batch.add(
+            svc.users().messages().get(
+                userId="me",
+                id=msg["id"],
+                format="metadata",
+                metadataHeaders=["Subject", "From", "Date"],
+                fields="payload/headers",
+            ),
+            request_id=msg["id"],
+        )
+    batch.execute()
+    if errors:
+        raise errors[0]
+
     results = []
     for msg in messages:
-        detail = svc.users().messages().get(
-            userId="me",
-            id=msg["id"],
-            format="metadata",
-            metadataHeaders=["Subject", "From", "Date"],
-        ).execute()
+        detail = details.get(msg["id"], {})
         hdrs = {h["name"]: h["value"] for h in detail.get("payload", {}).get("headers", [])}
         results.append({
             "subject": hdrs.get("Subject", "(no subject)"),
@@ -499,16 +874,21 @@ def search_inbox(email: str, query: str, max_results: int = 3) -> list:
     return results
 
 
+# One long-lived worker per inbox, so each inbox's Gmail client is built once and reused across searches
+_GMAIL_WORKERS = {email: ThreadPoolExecutor(max_workers=1, thread_name_prefix="gmail") for email in GMAIL_INBOXES}
+
+
 def gmail_search_all(query: str) -> dict:
-    """Search all inboxes. Returns {email: [message, ...]}."""
-    results = {}
-    for email in GMAIL_INBOXES:
+    """Search all inboxes concurrently. Returns {email: [message, ...]}."""
+    def _search(email):
         try:
-            results[email] = search_inbox(email, query)
+            return search_inbox(email, query)
         except Exception as exc:
             logger.error("Gmail error for %s: %s", email, exc)
-            results[email] = []
-    return results
+            return []
+
+    futures = {email: _GMAIL_WORKERS[email].submit(_search, email) for email in GMAIL_INBOXES}
+    return {email: fut.result() for email, fut in futures.items()}
 
 
 def fmt_gmail_results(results: dict, query: str) -> str:
@@ -551,16 +931,7 @@ Company details (use when asked):
 - IBAN: DE38100101237197421588 | BIC: QNTODEB2XXX
 - PayPal: svfproducts@spicevillage.eu
 
-Return ONLY valid JSON — no explanation, no markdown fences.
-
-Schema:
-{
-  "intent": "sales_by_period" | "sales_by_product" | "gmail_search" | "company_info" | "supplier_outstanding" | "unknown",
-  "period": "today" | "yesterday" | "last_7_days" | "this_week" | "last_week" | "this_month" | "last_month" | null,
-  "channel": "online" | "retail" | "total" | "compare" | null,
-  "product": "<product name>" | null,
-  "search_query": "<gmail search terms or supplier name>" | null
-}
+Always answer by calling the emit_intent tool. Use null for fields that do not apply.
 
 Channel rules:
 - "online", "shopify", "website", "web orders" → online
@@ -595,19 +966,134 @@ Other rules:
 """
 
 
-def parse_intent(message: str) -> dict:
+def _nullable_enum(*values):
+    return {"type": ["string", "null"], "enum": [*values, None]}
+
+
+INTENT_TOOL = {
+    "name": "emit_intent",
+    "description": "Record the parsed intent of the user's message.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "intent": {
+                "type": "string",
+                "enum": ["sales_by_period", "sales_by_product", "gmail_search",
+                         "company_info", "supplier_outstanding", "unknown"],
+            },
+            "period": _nullable_enum("today", "yesterday", "last_7_days", "this_week",
+                                     "last_week", "this_month", "last_month"),
+            "channel": _nullable_enum("online", "retail", "total", "compare"),
+            "product": {"type": ["string", "null"], "description": "Product name"},
+            "product_synonyms": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Other names or spellings the product may appear under in product "
+                               "titles (e.g. \"dahi\" for \"curd\"). Empty if none.",
+            },
+            "search_query": {"type": ["string", "null"], "description": "Gmail search terms or supplier name"},
+        },
+        "required": ["intent", "period", "channel", "product", "search_query"],
+    },
+}
+
+
+def _claude_parse_intent(message: str) -> dict:
     response = claude.messages.create(
         model="claude-haiku-4-5-20251001",
-        max_tokens=200,
-        system=SYSTEM_PROMPT,
+        max_tokens=128,
+        system=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+        tools=[INTENT_TOOL],
+        tool_choice={"type": "tool", "name": "emit_intent"},
         messages=[{"role": "user", "content": message}],
     )
-    text = response.content[0].text.strip()
-    if text.startswith("```"):
-        text = text.split("```")[1]
-        if text.startswith("json"):
-            text = text[4:]
-    return json.loads(text.strip())
+    tool_input = next((b.input for b in response.content if b.type == "tool_use"), None)
+    if tool_input is None:
+        # A bare StopIteration can't cross asyncio.to_thread — raise something the handler catches
+        raise ValueError(f"No emit_intent call in Claude response (stop_reason={response.stop_reason})")
+    return tool_input
+
+
+# Plain "<channel> sales <period>" questions are common enough to resolve locally.
+# A message qualifies only if every word is one of these tokens — anything else
+# (a product, a supplier, a typo) falls through to Claude.
+_FAST_PERIODS = {
+    "today": "today", "yesterday": "yesterday",
+    "this week": "this_week", "last week": "last_week",
+    "this month": "this_month", "last month": "last_month",
+    "past 7 days": "last_7_days", "last 7 days": "last_7_days",
+}
+_FAST_CHANNELS = {
+    "online": "online", "shopify": "online", "website": "online",
+    "retail": "retail", "in store": "retail", "in-store": "retail", "pos": "retail",
+    "total": "total", "overall": "total", "combined": "total",
+    "compare": "compare", "vs": "compare", "versus": "compare",
+}
+_FAST_TOKEN = re.compile(
+    r"[\s,]*(?:"
+    rf"(?P<period>{'|'.join(map(re.escape, _FAST_PERIODS))})"
+    rf"|(?P<channel>{'|'.join(map(re.escape, _FAST_CHANNELS))})"
+    r"|(?P<metric>sales|revenue|orders|turnover)"
+    r"|how|much|what|were|was|are|is|the|our|show|me|for|from|did|we|make|so|far|and"
+    r")\b"
+)
+
+
+def _fast_parse_intent(text: str):
+    """Resolve a simple sales-by-period question without Claude, or return None."""
+    text = text.rstrip("?!. ")
+    period, channels, metric, pos = None, set(), False, 0
+    while pos < len(text):
+        m = _FAST_TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            return None
+        if m["period"]:
+            if period is not None:
+                return None
+            period = _FAST_PERIODS[m["period"]]
+        elif m["channel"]:
+            channels.add(_FAST_CHANNELS[m["channel"]])
+            metric = metric or not channels.isdisjoint({"total", "compare"})
+        elif m["metric"]:
+            metric = True
+        pos = m.end()
+    if not (metric and period):
+        return None
+    if "compare" in channels or channels >= {"online", "retail"}:
+        if not channels <= {"online", "retail", "compare"}:
+            return None
+        channels = {"compare"}  # "online and retail", "online vs retail"
+    if len(channels) > 1:
+        return None
+    return {
+        "intent": "sales_by_period", "period": period,
+        "channel": next(iter(channels), None),
+        "product": None, "product_synonyms": [], "search_query": None,
+    }
+
+
+# Keyed by normalised message text. Periods are relative ("today", "last_week"),
+# so a cached parse doesn't go stale; the TTL just bounds prompt/model drift.
+_INTENT_CACHE = cachetools.TTLCache(maxsize=1024, ttl=3600)
+_INTENT_CACHE_LOCK = threading.Lock()
+
+
+def parse_intent(message: str) -> dict:
+    """Parse a message into an intent dict. Simple sales questions are resolved locally and
+    repeated ones are served from an in-memory cache; only the rest reach Claude."""
+    key = message.strip().lower()
+    fast = _fast_parse_intent(key)
+    if fast is not None:
+        return fast
+    with _INTENT_CACHE_LOCK:
+        parsed = _INTENT_CACHE.get(key)
+    if parsed is None:
+        parsed = _claude_parse_intent(key)
+        # Don't pin "unknown" — the user may rephrase or Claude may do better next time
+        if parsed.get("intent") != "unknown":
+            with _INTENT_CACHE_LOCK:
+                _INTENT_CACHE[key] = parsed
+    return dict(parsed)
 
 
 # ---------------------------------------------------------------------------
@@ -615,7 +1101,7 @@ def parse_intent(message: str) -> dict:
 # ---------------------------------------------------------------------------
 
 def fmt_period(data: dict, channel_label: str) -> str:
-    label = PERIOD_LABELS.get(data["period"], data["period"])
+    label = _period_label(data["period"])
     count_key = "order_count" if "order_count" in data else "transaction_count"
     count_label = "Orders" if "order_count" in data else "Transactions"
     return (
@@ -625,8 +1111,16 @@ def fmt_period(data: dict, channel_label: str) -> str:
     )
 
 
+def _matched_terms_note(product: str, *datas) -> str:
+    """List the search terms that matched when synonyms, not just the product name, were counted."""
+    terms = sorted({t for d in datas for t in d.get("matched_terms", ())})
+    if not terms or terms == [product.casefold().strip()]:
+        return ""
+    return "\nMatched: " + ", ".join(terms)
+
+
 def fmt_product(data: dict, channel_label: str = "") -> str:
-    label = PERIOD_LABELS.get(data["period"], data["period"])
+    label = _period_label(data["period"])
     prefix = f"{channel_label} — " if channel_label else ""
     if data["quantity"] == 0:
         channel_note = f" on {channel_label}" if channel_label else ""
@@ -635,12 +1129,13 @@ def fmt_product(data: dict, channel_label: str = "") -> str:
         f"{prefix}\"{data['product']}\" — {label}\n"
         f"Revenue: €{data['revenue']:,.2f}\n"
         f"Units sold: {data['quantity']}"
+        f"{_matched_terms_note(data['product'], data)}"
     )
 
 
 def fmt_product_cross_channel(shopify: dict, fc: dict) -> str:
     product = shopify["product"]
-    label = PERIOD_LABELS.get(shopify["period"], shopify["period"])
+    label = _period_label(shopify["period"])
     combined_rev = shopify["revenue"] + fc["revenue"]
     combined_qty = shopify["quantity"] + fc["quantity"]
 
@@ -654,11 +1149,12 @@ def fmt_product_cross_channel(shopify: dict, fc: dict) -> str:
         f"Retail (Flour Cloud): €{fc['revenue']:,.2f}  |  Units: {fc['quantity']}\n"
         f"\n"
         f"Combined: €{combined_rev:,.2f}  |  Units: {combined_qty}"
+        f"{_matched_terms_note(product, shopify, fc)}"
     )
 
 
 def fmt_compare(shopify: dict, fc: dict) -> str:
-    label = PERIOD_LABELS.get(shopify["period"], shopify["period"])
+    label = _period_label(shopify["period"])
     total = shopify["revenue"] + fc["revenue"]
     return (
         f"Sales comparison — {label}\n"
@@ -674,7 +1170,7 @@ def fmt_compare(shopify: dict, fc: dict) -> str:
 
 
 def fmt_total(shopify: dict, fc: dict) -> str:
-    label = PERIOD_LABELS.get(shopify["period"], shopify["period"])
+    label = _period_label(shopify["period"])
     total = shopify["revenue"] + fc["revenue"]
     return (
         f"Total sales — {label}\n"
@@ -709,11 +1205,14 @@ async def send_daily_report(context: ContextTypes.DEFAULT_TYPE) -> None:
     now_berlin  = datetime.now(BERLIN_TZ)
     yday_label  = (now_berlin - timedelta(days=1)).strftime("%d %b %Y")
     month_label = now_berlin.strftime("%B %Y")
+    # One clock reading shared by every source so all ranges line up
+    now_utc      = now_berlin.astimezone(timezone.utc)
+    today_berlin = now_berlin.date()
 
     async def _safe_fetch(fn, *args, retries=3, delay=300):
         for attempt in range(1, retries + 1):
             try:
-                return fn(*args)
+                return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
             except Exception as exc:
                 logger.warning("Daily report fetch attempt %d/%d failed (%s %s): %s", attempt, retries, fn.__name__, args, exc)
                 if attempt < retries:
@@ -722,11 +1221,16 @@ async def send_daily_report(context: ContextTypes.DEFAULT_TYPE) -> None:
         logger.error("Daily report fetch gave up after %d attempts (%s %s)", retries, fn.__name__, args)
         return None
 
-    retail_yday    = await _safe_fetch(flour_cloud_sales, "yesterday")
-    retail_mtd     = await _safe_fetch(flour_cloud_sales, "this_month")
-    online_yday    = await _safe_fetch(shopify_sales, "yesterday")
-    online_mtd     = await _safe_fetch(shopify_sales, "this_month")
-    restaurant = await _safe_fetch(restaurant_sales_all)
+    # Sources are independent I/O — fetch them concurrently in the thread pool
+    # Retail yesterday + MTD come from a single Flour Cloud fetch spanning both
+    retail, online_yday, online_mtd, restaurant = await asyncio.gather(
+        _safe_fetch(flour_cloud_sales_multi, ("yesterday", "this_month"), today_berlin),
+        _safe_fetch(shopify_sales, "yesterday", now_utc),
+        _safe_fetch(shopify_sales, "this_month", now_utc),
+        _safe_fetch(restaurant_sales_all, now_berlin),
+    )
+    retail_yday = retail["yesterday"] if retail is not None else None
+    retail_mtd  = retail["this_month"] if retail is not None else None
 
     def _fmt(data, key="revenue"):
         return f"€{data[key]:>10,.2f}" if data is not None else "      unavailable"
@@ -778,10 +1282,21 @@ async def send_cogs_report(context: ContextTypes.DEFAULT_TYPE) -> None:
         )
 
 
+# Caps blocking data fetches in flight across concurrently handled messages,
+# so a burst of questions can't exhaust the default thread pool or trip API rate limits
+_FETCH_SLOTS = asyncio.Semaphore(4)
+
+
+async def _fetch(fn, *args):
+    """Run a blocking fetch in a worker thread, holding one of the shared fetch slots."""
+    async with _FETCH_SLOTS:
+        return await asyncio.to_thread(fn, *args)
+
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
     if ALLOWED_USER_IDS and user_id not in ALLOWED_USER_IDS:
-        logger.info("Ignoring unauthorised user %s", user_id)
+        logger.debug("Ignoring unauthorised user %s", user_id)
         return
 
     text = (update.message.text or "").strip()
@@ -789,7 +1304,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
 
     try:
-        parsed = parse_intent(text)
+        parsed = await asyncio.to_thread(parse_intent, text)
     except Exception as exc:
         logger.error("Intent parse error: %s", exc)
         await update.message.reply_text("Sorry, I had trouble understanding that.\n\n" + HELP_TEXT)
@@ -799,6 +1314,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     period = parsed.get("period") or "today"
     channel = parsed.get("channel")
     product = parsed.get("product")
+    synonyms = parsed.get("product_synonyms") or ()
     search_query = parsed.get("search_query")
 
     logger.info("intent=%s period=%s channel=%s product=%s search_query=%s", intent, period, channel, product, search_query)
@@ -807,7 +1323,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text(HELP_TEXT)
         return
 
-    await update.message.reply_text("Checking...")
+    # Send the ack concurrently with the data fetch rather than before it
+    checking = asyncio.create_task(update.message.reply_text("Checking..."))
 
     try:
         if intent == "company_info":
@@ -836,52 +1353,59 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             if not search_query:
                 reply = "Which supplier? e.g. \"What do we owe Transfood?\""
             else:
-                data = fetch_supplier_outstanding(search_query)
+                data = await _fetch(fetch_supplier_outstanding, search_query)
                 reply = fmt_supplier_outstanding(data)
 
         elif intent == "gmail_search":
             if not search_query:
                 reply = "What should I search for? Try: \"find invoice from TRS\" or \"email about delivery\"."
             else:
-                results = gmail_search_all(search_query)
+                results = await _fetch(gmail_search_all, search_query)
                 reply = fmt_gmail_results(results, search_query)
 
         elif intent == "sales_by_product":
-            if channel in ("total", "compare"):
-                shopify_data = shopify_product_sales(period, product)
-                fc_data = flour_cloud_product_sales(period, product)
+            if not product:
+                reply = "Which product? e.g. \"How much basmati rice did we sell this week?\""
+            elif channel in ("total", "compare"):
+                shopify_data, fc_data = await asyncio.gather(
+                    _fetch(shopify_product_sales, period, product, synonyms),
+                    _fetch(flour_cloud_product_sales, period, product, synonyms),
+                )
                 reply = fmt_product_cross_channel(shopify_data, fc_data)
             elif channel == "retail":
-                fc_data = flour_cloud_product_sales(period, product)
+                fc_data = await _fetch(flour_cloud_product_sales, period, product, synonyms)
                 reply = fmt_product(fc_data, "Retail (Flour Cloud)")
             else:
                 # Default: online only
-                shopify_data = shopify_product_sales(period, product)
+                shopify_data = await _fetch(shopify_product_sales, period, product, synonyms)
                 reply = fmt_product(shopify_data)
 
-        elif channel == "compare":
-            shopify_data = shopify_sales(period)
-            fc_data = flour_cloud_sales(period)
-            reply = fmt_compare(shopify_data, fc_data)
-
-        elif channel == "total":
-            shopify_data = shopify_sales(period)
-            fc_data = flour_cloud_sales(period)
-            reply = fmt_total(shopify_data, fc_data)
+        elif channel in ("compare", "total"):
+            # Independent hosts — fetch both channels concurrently
+            shopify_data, fc_data = await asyncio.gather(
+                _fetch(shopify_sales, period),
+                _fetch(flour_cloud_sales, period),
+            )
+            fmt = fmt_compare if channel == "compare" else fmt_total
+            reply = fmt(shopify_data, fc_data)
 
         elif channel == "retail":
-            fc_data = flour_cloud_sales(period)
+            fc_data = await _fetch(flour_cloud_sales, period)
             reply = fmt_period(fc_data, "Retail (Flour Cloud)")
 
         else:
             # Default: Shopify / online
-            shopify_data = shopify_sales(period)
+            shopify_data = await _fetch(shopify_sales, period)
             reply = fmt_period(shopify_data, "Online (Shopify)")
 
     except Exception as exc:
         logger.error("Data fetch error: %s", exc)
         reply = f"Couldn't fetch data: {exc}"
 
+    try:
+        await checking
+    except Exception as exc:
+        logger.warning("Could not send ack: %s", exc)
     await update.message.reply_text(reply)
 
 
@@ -890,7 +1414,19 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 # ---------------------------------------------------------------------------
 
 def main() -> None:
-    app = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        # Outbound replies share PTB's default 256-connection keep-alive pool, matching the
+        # 256 concurrent updates below; getUpdates keeps its own connection
+        .connect_timeout(5)
+        .read_timeout(15)
+        # Chats are handled in parallel. The rate limiter throttles to Bot API limits and, on a
+        # flood-wait 429, sleeps for retry_after and resends (PTB's default is max_retries=0)
+        .concurrent_updates(True)
+        .rate_limiter(AIORateLimiter(max_retries=3))
+        .build()
+    )
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
 
     if DAILY_REPORT_CHAT_ID:
@@ -912,8 +1448,31 @@ def main() -> None:
     else:
         logger.warning("DAILY_REPORT_CHAT_ID not set — daily report disabled")
 
+    # Off the main thread so a slow host never delays polling startup
+    threading.Thread(target=_prewarm_sessions, name="prewarm", daemon=True).start()
+
     logger.info("Bot is running. Press Ctrl+C to stop.")
-    app.run_polling()
+    # Messages only — the bot has no handlers for other update types
+    use_webhook = bool(WEBHOOK_URL)
+    if use_webhook and not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", WEBHOOK_SECRET or ""):
+        # Without the secret header check anyone could POST forged updates from a whitelisted user id
+        logger.error("WEBHOOK_URL is set but WEBHOOK_SECRET is missing or invalid "
+                     "(1-256 chars of A-Z, a-z, 0-9, _ and -) — falling back to long polling")
+        use_webhook = False
+
+    if use_webhook:
+        # Telegram pushes each update as it arrives; the secret token (not the bot
+        # token) authenticates the calls, so the bot token never appears in URLs
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.getenv("PORT", "8443")),
+            url_path="telegram",
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/telegram",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=[Update.MESSAGE],
+        )
+    else:
+        app.run_polling(timeout=30, allowed_updates=[Update.MESSAGE])
 
 
 if __name__ == "__main__":
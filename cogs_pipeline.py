@@ -15,15 +15,18 @@ refund_revenue = subtotal (already ex-VAT in Shopify).
 refund_tax = total_tax on refund line item.
 """
 
+import math
 import os
 import sqlite3
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
-import pytz
 import requests
 from google.oauth2 import service_account
 from googleapiclient.discovery import build as google_build
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ── Constants ──────────────────────────────────────────────────────────────
 
@@ -32,10 +35,20 @@ SHOPIFY_TOKEN  = os.getenv("SHOPIFY_ACCESS_TOKEN")
 COGS_SHEET_ID  = "1vmL9PXQMgwxEioHAIydtOvRbPwBaF4gQbUsIbfG2Y_A"
 COGS_TAB       = "COGS Daily"
 COGS_DB_PATH   = os.getenv("COGS_DB_PATH", "cogs.db")
-BERLIN_TZ      = pytz.timezone("Europe/Berlin")
+BERLIN_TZ      = ZoneInfo("Europe/Berlin")
 API_VERSION    = "2024-10"
 SH             = {"X-Shopify-Access-Token": SHOPIFY_TOKEN}
 
+# Keep-alive session: pagination reuses one TLS connection. 429s are handled
+# explicitly below (Retry-After); urllib3 only retries transient 5xx.
+_SHOPIFY_HTTP = requests.Session()
+_SHOPIFY_HTTP.headers.update(SH)
+_SHOPIFY_HTTP.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+                      raise_on_status=False),
+))
+
 _SERVICE_ACCOUNT_FILE = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "service_account.json"
 )
@@ -208,7 +221,7 @@ def _paginate(url: str, key: str) -> list:
     results = []
     while url:
         while True:
-            r = requests.get(url, headers=SH, timeout=30)
+            r = _SHOPIFY_HTTP.get(url, timeout=30)
             if r.status_code == 429:
                 wait = float(r.headers.get("Retry-After", 2))
                 time.sleep(wait)
@@ -233,10 +246,10 @@ def _fetch_inventory_costs(inv_ids: list) -> dict:
     for i in range(0, len(unique), 100):
         batch = unique[i:i + 100]
         while True:
-            r = requests.get(
+            r = _SHOPIFY_HTTP.get(
                 f"https://{SHOPIFY_STORE}/admin/api/{API_VERSION}/inventory_items.json"
                 f"?ids={','.join(str(x) for x in batch)}&limit=100",
-                headers=SH, timeout=30
+                timeout=30
             )
             if r.status_code == 429:
                 wait = float(r.headers.get("Retry-After", 2))
@@ -274,10 +287,10 @@ def run_daily_pipeline(date_str: str = None) -> str:
     if date_str is None:
         date_str = (now_berlin - timedelta(days=1)).strftime("%Y-%m-%d")
 
-    berlin_start = BERLIN_TZ.localize(datetime.strptime(date_str, "%Y-%m-%d"))
+    berlin_start = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=BERLIN_TZ)
     berlin_end   = berlin_start + timedelta(days=1) - timedelta(seconds=1)
-    utc_start    = berlin_start.astimezone(pytz.utc).isoformat()
-    utc_end      = berlin_end.astimezone(pytz.utc).isoformat()
+    utc_start    = berlin_start.astimezone(timezone.utc).isoformat()
+    utc_end      = berlin_end.astimezone(timezone.utc).isoformat()
 
     # ── 1. Pull orders ─────────────────────────────────────────────────────
     url = (f"https://{SHOPIFY_STORE}/admin/api/{API_VERSION}/orders.json"
@@ -307,7 +320,7 @@ def run_daily_pipeline(date_str: str = None) -> str:
             key   = (oid, lid)
             qty   = li.get("quantity", 0)
             price = float(li.get("price", 0))
-            li_tax = sum(float(t.get("price", 0)) for t in li.get("tax_lines", []))
+            li_tax = math.fsum(float(t.get("price", 0)) for t in li.get("tax_lines", []))
             inv_id = variant_map.get(vid)
             agg[key] = {
                 "order_id":      oid,
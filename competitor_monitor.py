@@ -20,11 +20,13 @@ from difflib import SequenceMatcher
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from zoneinfo import ZoneInfo
 
-import pytz
 import requests
 from google.oauth2 import service_account
 from googleapiclient.discovery import build as google_build
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ── Constants ──────────────────────────────────────────────────────────────
 
@@ -33,9 +35,20 @@ SHOPIFY_TOKEN  = os.getenv("SHOPIFY_ACCESS_TOKEN")
 API_VERSION    = "2024-10"
 SH             = {"X-Shopify-Access-Token": SHOPIFY_TOKEN}
 
+# Keep-alive sessions (one for our Shopify admin API, one for competitor
+# storefronts). 429s are handled explicitly; urllib3 only retries 5xx.
+_RETRY_5XX = Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+                   raise_on_status=False)
+_SHOPIFY_HTTP = requests.Session()
+_SHOPIFY_HTTP.headers.update(SH)
+_SHOPIFY_HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=_RETRY_5XX))
+_STOREFRONT_HTTP = requests.Session()
+_STOREFRONT_HTTP.headers.update({"User-Agent": "Mozilla/5.0"})
+_STOREFRONT_HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=_RETRY_5XX))
+
 RECIPIENTS   = ["sparikh@spicevillage.eu", "info@spicevillage.eu"]
 SENDER_EMAIL = "sparikh@spicevillage.eu"
-BERLIN_TZ    = pytz.timezone("Europe/Berlin")
+BERLIN_TZ    = ZoneInfo("Europe/Berlin")
 
 COMPETITORS = {
     "Jamoona": "https://www.jamoona.com",
@@ -78,7 +91,7 @@ def fetch_our_prices(skus: list) -> dict:
            f"/variants.json?limit=250&fields=sku,price,title")
     while url:
         while True:
-            r = requests.get(url, headers=SH, timeout=30)
+            r = _SHOPIFY_HTTP.get(url, timeout=30)
             if r.status_code == 429:
                 time.sleep(float(r.headers.get("Retry-After", 2)))
                 continue
@@ -141,10 +154,10 @@ def _search_suggest(base_url: str, query: str, weight_g: int) -> list:
            f"?q={requests.utils.quote(query)}"
            f"&resources[type]=product&resources[limit]=10")
     try:
-        r = requests.get(url, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
+        r = _STOREFRONT_HTTP.get(url, timeout=15)
         if r.status_code == 429:
             time.sleep(3)
-            r = requests.get(url, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
+            r = _STOREFRONT_HTTP.get(url, timeout=15)
         r.raise_for_status()
     except Exception:
         return []
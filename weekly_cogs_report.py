@@ -4,6 +4,7 @@ Usage: python3 weekly_cogs_report.py [YYYY-MM-DD] [YYYY-MM-DD]
        python3 weekly_cogs_report.py              # defaults to last 7 days
 """
 
+import math
 import os
 import requests
 import time
@@ -11,17 +12,24 @@ import sys
 from collections import defaultdict
 from datetime import datetime, timedelta
 
+from requests.adapters import HTTPAdapter
+
 STORE = 'spice-village-eu.myshopify.com'
 TOKEN = os.environ['SHOPIFY_ACCESS_TOKEN']
 H = {'X-Shopify-Access-Token': TOKEN}
 
+# Keep-alive session so every page/batch reuses one TLS connection
+SESSION = requests.Session()
+SESSION.headers.update(H)
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────
 
 def paginate(url, key):
     """Cursor-based pagination. Yields items from `key` across all pages."""
     while url:
-        r = requests.get(url, headers=H)
+        r = SESSION.get(url)
         if r.status_code == 429:
             wait = float(r.headers.get('Retry-After', 2))
             print(f"  Rate limited, waiting {wait}s...")
@@ -45,10 +53,9 @@ def fetch_inventory_costs(inv_ids):
     batches = [unique_ids[i:i+100] for i in range(0, len(unique_ids), 100)]
     for batch in batches:
         while True:
-            r = requests.get(
+            r = SESSION.get(
                 f'https://{STORE}/admin/api/2024-10/inventory_items.json'
-                f'?ids={",".join(str(x) for x in batch)}&limit=100',
-                headers=H
+                f'?ids={",".join(str(x) for x in batch)}&limit=100'
             )
             if r.status_code == 429:
                 wait = float(r.headers.get('Retry-After', 2))
@@ -176,14 +183,15 @@ def print_report(costed, unknown, date_from, date_to, n_orders):
     print(HDR)
     print(SEP)
 
-    total_rev = total_cogs = total_gp = warn_count = 0
+    # fsum keeps the euro totals exactly rounded across hundreds of rows
+    total_rev  = math.fsum(r['net_revenue'] for r in costed)
+    total_cogs = math.fsum(r['cogs_eur'] for r in costed)
+    total_gp   = math.fsum(r['gross_profit'] for r in costed)
+    warn_count = 0
 
     for row in costed:
         flag = ' ⚠️' if row['cogs_pct'] > 60 else ''
         warn_count  += 1 if row['cogs_pct'] > 60 else 0
-        total_rev   += row['net_revenue']
-        total_cogs  += row['cogs_eur']
-        total_gp    += row['gross_profit']
         rfnd = f"-{row['refund_qty']}" if row['refund_qty'] else ''
         print(f"  {row['title'][:40]:<40}  {row['sku'][:12]:<12}  "
               f"{row['gross_qty']:>4}  {rfnd:>4}  "
@@ -200,7 +208,7 @@ def print_report(costed, unknown, date_from, date_to, n_orders):
           f"Gross profit: €{total_gp:,.0f}")
 
     if unknown:
-        unknown_rev  = sum(r['net_revenue'] for r in unknown)
+        unknown_rev  = math.fsum(r['net_revenue'] for r in unknown)
         grand_total  = total_rev + unknown_rev
         blind_pct    = unknown_rev / grand_total * 100 if grand_total else 0
         print(f"\n{'─'*W}")